@@ -0,0 +1,186 @@
+import os
+import json
+import struct
+
+# === Sidecar offset index ===
+# A chunk is a JSON array of video ID strings. Its sidecar (<chunk>.idx) holds
+# a fixed header (source size, entry count) followed by one 8-byte offset per
+# entry, so entry i lives at HEADER_SIZE + 8 * i. Chunks are append-only, so
+# the source size alone tells whether the sidecar is current; mtime is not
+# used because a fresh checkout resets it.
+INDEX_SUFFIX = ".idx"
+HEADER = struct.Struct("<QQ")
+OFFSET = struct.Struct("<Q")
+READ_BLOCK = 64 * 1024
+
+
+def index_path(path):
+    return path + INDEX_SUFFIX
+
+
+def _iter_string_offsets(f):
+    """Yield the byte offset of every string in a JSON array, reading in blocks."""
+    buf = f.read(READ_BLOCK)
+    base = 0
+    start = len(buf) - len(buf.lstrip())
+    if buf[start:start + 1] != b"[":
+        return
+
+    pos = start + 1
+    while True:
+        quote = buf.find(b'"', pos)
+        if quote == -1:
+            more = f.read(READ_BLOCK)
+            if not more:
+                return
+            base += len(buf)
+            buf, pos = more, 0
+            continue
+
+        # Find the closing quote, skipping escaped ones and pulling more data if needed
+        end = quote + 1
+        while True:
+            end = buf.find(b'"', end)
+            if end == -1:
+                more = f.read(READ_BLOCK)
+                if not more:
+                    return
+                base += quote
+                buf = buf[quote:] + more
+                end, quote = len(buf) - len(more), 0
+                continue
+            backslashes = 0
+            while buf[end - 1 - backslashes] == 0x5C:
+                backslashes += 1
+            if backslashes % 2 == 0:
+                break
+            end += 1
+
+        yield base + quote
+        pos = end + 1
+
+
+def build_chunk_index(path):
+    """Scan a chunk once and write its sidecar offset index. Returns the entry count."""
+    size = os.path.getsize(path)
+    tmp_path = index_path(path) + ".tmp"
+    count = 0
+    with open(path, "rb") as src, open(tmp_path, "wb") as idx:
+        idx.write(HEADER.pack(size, 0))
+        for offset in _iter_string_offsets(src):
+            idx.write(OFFSET.pack(offset))
+            count += 1
+        idx.seek(0)
+        idx.write(HEADER.pack(size, count))
+    os.replace(tmp_path, index_path(path))
+    return count
+
+
+def _read_header(path):
+    try:
+        with open(index_path(path), "rb") as idx:
+            header = idx.read(HEADER.size)
+    except OSError:
+        return None
+    if len(header) != HEADER.size:
+        return None
+    return HEADER.unpack(header)
+
+
+def ensure_chunk_index(path):
+    """Return the entry count, rebuilding the sidecar if it is missing or stale."""
+    header = _read_header(path)
+    if header and header[0] == os.path.getsize(path):
+        return header[1]
+    return build_chunk_index(path)
+
+
+def chunk_length(path):
+    """Number of video IDs in a chunk, read from the sidecar header."""
+    if not os.path.exists(path):
+        return 0
+    return ensure_chunk_index(path)
+
+
+def _read_string_at(f, offset):
+    f.seek(offset)
+    token = b""
+    while True:
+        block = f.read(256)
+        if not block:
+            raise ValueError(f"Unterminated string at offset {offset}")
+        token += block
+        end = 1
+        while True:
+            end = token.find(b'"', end)
+            if end == -1:
+                break
+            backslashes = 0
+            while token[end - 1 - backslashes] == 0x5C:
+                backslashes += 1
+            if backslashes % 2 == 0:
+                return json.loads(token[:end + 1])
+            end += 1
+
+
+def iter_chunk(path, start=0):
+    """Lazily yield video IDs from a chunk, seeking straight to `start`."""
+    count = chunk_length(path)
+    if start >= count:
+        return
+
+    with open(index_path(path), "rb") as idx, open(path, "rb") as src:
+        idx.seek(HEADER.size + OFFSET.size * start)
+        for _ in range(start, count):
+            (offset,) = OFFSET.unpack(idx.read(OFFSET.size))
+            yield _read_string_at(src, offset)
+
+
+def _extend_chunk_index(path, offsets):
+    """Append new entry offsets to a current sidecar and refresh its header."""
+    with open(index_path(path), "rb+") as idx:
+        _, count = HEADER.unpack(idx.read(HEADER.size))
+        idx.seek(HEADER.size + OFFSET.size * count)
+        idx.truncate()
+        for offset in offsets:
+            idx.write(OFFSET.pack(offset))
+        idx.seek(0)
+        idx.write(HEADER.pack(os.path.getsize(path), count + len(offsets)))
+
+
+def append_to_chunk(path, video_ids):
+    """Append IDs to a chunk in place, keeping the json.dump(indent=2) layout.
+
+    The sidecar is extended with the new offsets rather than rebuilt, so the
+    cost is proportional to the IDs appended.
+    """
+    if not video_ids:
+        return
+
+    if chunk_length(path) == 0:
+        with open(path, "w") as f:
+            f.write(json.dumps(video_ids, indent=2))
+        build_chunk_index(path)
+        return
+
+    # Drop the closing bracket (and any whitespace around it) and continue the array
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        tail_start = max(0, f.tell() - READ_BLOCK)
+        f.seek(tail_start)
+        tail = f.read()
+        close = tail.rstrip().rfind(b"]")
+        position = tail_start + len(tail[:close].rstrip())
+        f.seek(position)
+        f.truncate()
+
+        offsets = []
+        for vid in video_ids:
+            entry = b",\n  "
+            offsets.append(position + len(entry))
+            entry += json.dumps(vid).encode()
+            f.write(entry)
+            position += len(entry)
+        f.write(b"\n]")
+
+    _extend_chunk_index(path, offsets)
@@ -1,6 +1,5 @@
 import os
 import re
-import json
 import time
 import random
 import requests
@@ -8,6 +7,7 @@ import tldextract
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from supabase import create_client
+from chunk_reader import chunk_length, iter_chunk
 
 # === Load .env ===
 load_dotenv()
@@ -26,6 +26,7 @@ MAIN_TABLE = "Clickyleaks"
 
 MAX_DOMAINS = 10
 MAX_RUNTIME_MINUTES = 5
+WINDOW_SIZE = 50  # videos per batched Clickyleaks lookup
 
 SUPPORTED_TLDS = {
     "com", "me", "net", "org", "sh", "io", "co", "club", "biz", "mobi", "info", "us",
@@ -85,13 +86,7 @@ def save_progress(chunk_name, index, done=False):
         print(f"[Warning] Cannot check chunk size — file missing: {chunk_name}")
         return
 
-    with open(path, "r") as f:
-        try:
-            chunk_data = json.load(f)
-        except json.JSONDecodeError:
-            chunk_data = []
-
-    is_full = index >= len(chunk_data)
+    is_full = index >= chunk_length(path)
     fully_scanned = done and is_full
 
     print(f"[Progress] Saving: {chunk_name}, index={index}, fully_scanned={fully_scanned}")
@@ -130,6 +125,84 @@ def get_logged_domains(domain_list):
         return set(entry["domain"] for entry in result.data)
     return set()
 
+def collect_candidate_roots(links, stats):
+    """Apply the local TLD and well-known filters to one video's links.
+
+    Returns {root: link}; network checks are left to process_window.
+    """
+    link_map = {}
+    for link in links:
+        root = extract_root_domain(link)
+        tld = tldextract.extract(link).suffix.lower()
+
+        if tld not in SUPPORTED_TLDS:
+            print(f"[Skip] Unsupported TLD: {tld} ({root})")
+            continue
+        if root in WELL_KNOWN_DOMAINS:
+            stats["well_known_skipped"] += 1
+            print(f"[Skip] Well-known: {root}")
+            continue
+
+        link_map[root] = link
+    return link_map
+
+def process_window(chunk_name, window, stats, deadline):
+    """Log new domains for a window of fetched videos, in chunk order.
+
+    Already-logged roots for the whole window are resolved with one query, so
+    duplicates are dropped before any probe. Each entry's stat counts are only
+    applied once the entry is handled. Returns the index to resume from if the
+    deadline or MAX_DOMAINS is hit, otherwise None.
+    """
+    candidate_roots = sorted({root for entry in window for root in entry["link_map"]})
+    logged_roots = get_logged_domains(candidate_roots)
+    resolving_roots = set()
+
+    for entry in window:
+        if datetime.utcnow() > deadline:
+            print("[Stop] Max runtime reached.")
+            return entry["index"]
+
+        if len(stats["new_domains"]) >= MAX_DOMAINS:
+            print("[Stop] Max domains found.")
+            return entry["index"]
+
+        for key, count in entry["stats"].items():
+            stats[key] += count
+
+        video_id = entry["video_id"]
+        for root, link in entry["link_map"].items():
+            if root in logged_roots:
+                stats["existing_skipped"] += 1
+                print(f"[Skip] Already logged: {root}")
+                continue
+            if root in resolving_roots or not soft_check_domain_availability(root):
+                resolving_roots.add(root)
+                stats["resolves_skipped"] += 1
+                print(f"[Skip] Still resolves: {root}")
+                continue
+
+            supabase.table(MAIN_TABLE).upsert({
+                "domain": root,
+                "full_url": link,
+                "video_title": entry["title"],
+                "video_url": f"https://www.youtube.com/watch?v={video_id}",
+                "view_count": entry["views"],
+                "video_id": video_id,
+                "verified": False,
+                "is_available": True,
+                "discovered_at": datetime.utcnow().isoformat()
+            }, on_conflict=["video_id", "domain"]).execute()
+
+            logged_roots.add(root)
+            stats["new_domains"].append(root)
+            print(f"[Log] Domain logged: {root}")
+
+        supabase.table(CHECKED_TABLE).insert({"video_id": video_id}).execute()
+        save_progress(chunk_name, entry["index"] + 1)
+
+    return None
+
 def get_video_data_youtube_api(video_id):
     url = "https://www.googleapis.com/youtube/v3/videos"
     params = {
@@ -189,10 +262,9 @@ def main():
         print(f"[Error] Chunk file not found: {path}")
         return
 
-    with open(path, "r") as f:
-        videos = json.load(f)
+    total_videos = chunk_length(path)
 
-    print(f"[Start] Scanning {len(videos)} videos from {chunk_name} starting at index {start_index}")
+    print(f"[Start] Scanning {total_videos} videos from {chunk_name} starting at index {start_index}")
 
     stats = {
         "chunk": chunk_name,
@@ -205,90 +277,73 @@ def main():
         "new_domains": []
     }
 
-    start_time = datetime.utcnow()
-    domains_found = 0
-
-    for i in range(start_index, len(videos)):
-        video_id = videos[i]
-        stats["videos_scanned"] += 1
-
-        if already_checked(video_id):
+    deadline = datetime.utcnow() + timedelta(minutes=MAX_RUNTIME_MINUTES)
+    window = []
+    window_ids = set()
+    window_started = None
+
+    for i, video_id in enumerate(iter_chunk(path, start_index), start=start_index):
+        # Flush early once fetching this window has taken as long as the time
+        # left, so it is still processed before the deadline
+        now = datetime.utcnow()
+        if window and (len(window) >= WINDOW_SIZE or now - window_started >= deadline - now):
+            stop_index = process_window(chunk_name, window, stats, deadline)
+            window = []
+            window_ids = set()
+            if stop_index is not None:
+                save_progress(chunk_name, stop_index)
+                send_discord_alert(stats)
+                return
+
+        # Skipped videos are counted with the previous pending entry, so a stop
+        # before that entry doesn't count them twice across runs
+        pending_stats = window[-1]["stats"] if window else stats
+
+        if video_id in window_ids or already_checked(video_id):
+            pending_stats["videos_scanned"] += 1
             print(f"[Skip] Already checked {video_id}")
             continue
 
-        if datetime.utcnow() - start_time > timedelta(minutes=MAX_RUNTIME_MINUTES):
+        if datetime.utcnow() > deadline:
             print("[Stop] Max runtime reached.")
-            save_progress(chunk_name, i)
+            save_progress(chunk_name, window[0]["index"] if window else i)
             send_discord_alert(stats)
             return
 
-        if domains_found >= MAX_DOMAINS:
+        if len(stats["new_domains"]) >= MAX_DOMAINS:
             print("[Stop] Max domains found.")
             save_progress(chunk_name, i)
             send_discord_alert(stats)
             return
 
+        entry_stats = {"videos_scanned": 1, "unavailable": 0, "no_links": 0, "well_known_skipped": 0}
+        entry = {"index": i, "video_id": video_id, "link_map": {}, "stats": entry_stats}
+        if not window:
+            window_started = datetime.utcnow()
+        window.append(entry)
+        window_ids.add(video_id)
+
         desc, title, views = get_video_data_youtube_api(video_id)
         if not desc or views < 20000:
             print(f"[Skip] {video_id} - No description or under 20K views ({views})")
-            stats["unavailable"] += 1
-            supabase.table(CHECKED_TABLE).insert({"video_id": video_id}).execute()
-            save_progress(chunk_name, i + 1)
-            continue
-
-        links = extract_links_from_description(desc)
-        if not links:
-            stats["no_links"] += 1
-            print(f"[No Links] {video_id}")
+            entry_stats["unavailable"] += 1
         else:
-            all_roots = []
-            link_map = {}
-
-            for link in links:
-                root = extract_root_domain(link)
-                tld = tldextract.extract(link).suffix.lower()
-
-                if tld not in SUPPORTED_TLDS:
-                    print(f"[Skip] Unsupported TLD: {tld} ({root})")
-                    continue
-                if root in WELL_KNOWN_DOMAINS:
-                    stats["well_known_skipped"] += 1
-                    print(f"[Skip] Well-known: {root}")
-                    continue
-                if not soft_check_domain_availability(root):
-                    stats["resolves_skipped"] += 1
-                    print(f"[Skip] Still resolves: {root}")
-                    continue
-
-                all_roots.append(root)
-                link_map[root] = link
-
-            existing_roots = get_logged_domains(all_roots)
-            new_roots = [r for r in all_roots if r not in existing_roots]
-            stats["existing_skipped"] += len(existing_roots)
-
-            for root in new_roots:
-                supabase.table(MAIN_TABLE).upsert({
-                    "domain": root,
-                    "full_url": link_map[root],
-                    "video_title": title,
-                    "video_url": f"https://www.youtube.com/watch?v={video_id}",
-                    "view_count": views,
-                    "video_id": video_id,
-                    "verified": False,
-                    "is_available": True,
-                    "discovered_at": datetime.utcnow().isoformat()
-                }, on_conflict=["video_id", "domain"]).execute()
-
-                domains_found += 1
-                stats["new_domains"].append(root)
-                print(f"[Log] Domain logged: {root}")
-
-        supabase.table(CHECKED_TABLE).insert({"video_id": video_id}).execute()
-        save_progress(chunk_name, i + 1)
-        time.sleep(random.uniform(1, 2))
+            entry.update(title=title, views=views)
+            links = extract_links_from_description(desc)
+            if not links:
+                entry_stats["no_links"] += 1
+                print(f"[No Links] {video_id}")
+            else:
+                entry["link_map"] = collect_candidate_roots(links, entry_stats)
+            time.sleep(random.uniform(1, 2))
+
+    stop_index = process_window(chunk_name, window, stats, deadline)
+    if stop_index is not None:
+        save_progress(chunk_name, stop_index)
+        send_discord_alert(stats)
+        return
 
-    save_progress(chunk_name, len(videos), done=True)
+    save_progress(chunk_name, total_videos, done=True)
     send_discord_alert(stats)
     print("[Done] Scan complete.")
 
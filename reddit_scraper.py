@@ -1,9 +1,9 @@
 import os
-import json
 import random
 import requests
 from dotenv import load_dotenv
 from supabase import create_client
+from chunk_reader import chunk_length, append_to_chunk
 
 # === Load environment variables ===
 load_dotenv()
@@ -82,21 +82,8 @@ def get_latest_chunk_number():
     return max(numbers) if numbers else 1
 
 
-def load_chunk(chunk_number):
-    path = os.path.join(CHUNK_DIR, f"reddit_chunk_{chunk_number}.json")
-    if not os.path.exists(path):
-        return []
-    with open(path, "r") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return []
-
-
-def save_chunk(chunk_number, data):
-    path = os.path.join(CHUNK_DIR, f"reddit_chunk_{chunk_number}.json")
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
+def chunk_path(chunk_number):
+    return os.path.join(CHUNK_DIR, f"reddit_chunk_{chunk_number}.json")
 
 
 def save_ids_to_chunks(new_ids):
@@ -104,17 +91,16 @@ def save_ids_to_chunks(new_ids):
         return
 
     chunk_num = get_latest_chunk_number()
-    current_data = load_chunk(chunk_num)
-    combined = current_data + new_ids
-
-    while len(combined) > MAX_IDS_PER_CHUNK:
-        to_save = combined[:MAX_IDS_PER_CHUNK]
-        save_chunk(chunk_num, to_save)
-        combined = combined[MAX_IDS_PER_CHUNK:]
-        chunk_num += 1
+    remaining = new_ids
 
-    if combined:
-        save_chunk(chunk_num, combined)
+    # Append in place; only the chunk length is read, never the full chunk
+    while remaining:
+        room = MAX_IDS_PER_CHUNK - chunk_length(chunk_path(chunk_num))
+        if room <= 0:
+            chunk_num += 1
+            continue
+        append_to_chunk(chunk_path(chunk_num), remaining[:room])
+        remaining = remaining[room:]
 
     print(f"[Save] Added {len(new_ids)} new IDs across chunks.")
 